@@ -2,33 +2,15 @@ import streamlit as st
 import numpy as np
 import plotly.graph_objects as go
 
-# --- SCIENTIFIC CONSTANTS (UPDATED PER LESNIAK ET AL. 2019) ---
-ZR89_HALFLIFE = 78.41  # Hours (Zirconium-89)
-ATEZO_KD = 0.43        # nM (Reference Antibody Blocker from 2016 paper)
-WL12_KI = 12.3         # nM (Ki from 2019 Paper - more accurate than IC50)
-
-TRACER_LIBRARY = {
-    "WL12 (Chatterjee Peptide)": {
-        "kd_nm": 12.3,
-        "molecular_weight_kda": 1.5,
-        "note": "Affinity based on Ki (12.3nM) from 2019 FRET assay. Accounts for FPy-WL12 analog.",
-    },
-    "Atezolizumab (Antibody)": {
-        "kd_nm": 0.43,
-        "molecular_weight_kda": 145,
-        "note": "Reference clinical immuno-PET antibody tracer (Sub-nanomolar affinity).",
-    },
-    "PD-L1 Nanobody": {
-        "kd_nm": 2.10,
-        "molecular_weight_kda": 15,
-        "note": "Small biologic with fast kinetics and mid-range affinity.",
-    },
-    "PD-L1 Small Molecule": {
-        "kd_nm": 12.00,
-        "molecular_weight_kda": 0.8,
-        "note": "Fast distribution; generally lower affinity than antibodies.",
-    },
-}
+from tracer_model import (
+    ATEZO_KD,
+    CONC_RANGE,
+    DECAY_LUT_ZR89,
+    MAX_IMAGING_HOURS,
+    TRACER_KEYS,
+    TRACER_LIBRARY,
+    langmuir_bundle,
+)
 
 st.set_page_config(
     page_title="ImmunoPET-Tracer-Optimizer",
@@ -46,28 +28,34 @@ st.markdown(
 """
 )
 
+@st.cache_data
+def tracer_info_md(name):
+    """Kd and the rendered sidebar note for a tracer, keyed on its name."""
+    tracer = TRACER_LIBRARY[name]
+    return tracer["kd_nm"], (
+        f"**Selected Ki (WL12):** {tracer['kd_nm']} nM (FRET inhibition assay, Lesniak 2019)\n\n"
+        f"**Molecular Weight:** {tracer['molecular_weight_kda']} kDa\n\n"
+        f"{tracer['note']}"
+    )
+
 # --- SIDEBAR: EXPERIMENTAL DESIGN ---
 st.sidebar.header("🧪 Experimental Parameters")
 
-st.sidebar.subheader("Tracer Library")
-selected_tracer = st.sidebar.selectbox(
+# Batch the rarely-tuned inputs so a slider drag doesn't rerun the model per tick
+params = st.sidebar.form("params")
+
+params.subheader("Tracer Library")
+selected_tracer = params.selectbox(
     "Select Tracer for Simulation",
-    options=list(TRACER_LIBRARY.keys()),
+    options=TRACER_KEYS,
     help="Updates affinity (Kd/Ki) and MW assumptions based on tracer class.",
 )
 
-active_tracer = TRACER_LIBRARY[selected_tracer]
-active_kd = active_tracer["kd_nm"]
-active_mw = active_tracer["molecular_weight_kda"]
+active_kd, info_md = tracer_info_md(selected_tracer)
+params.info(info_md)
 
-st.sidebar.info(
-    f"**Selected Ki (WL12):** {active_kd} nM (FRET inhibition assay, Lesniak 2019)\n\n"
-    f"**Molecular Weight:** {active_mw} kDa\n\n"
-    f"{active_tracer['note']}"
-)
-
-st.sidebar.subheader("Biological Target")
-b_max = st.sidebar.slider(
+params.subheader("Biological Target")
+b_max = params.slider(
     "Receptor Density (Bmax) [fmol/mg]",
     min_value=10,
     max_value=500,
@@ -75,7 +63,7 @@ b_max = st.sidebar.slider(
     help="Target density of PD-L1 receptors in tumor tissue."
 )
 
-uncertainty_pct = st.sidebar.slider(
+uncertainty_pct = params.slider(
     "Bmax Uncertainty [%]",
     min_value=0,
     max_value=50,
@@ -84,125 +72,176 @@ uncertainty_pct = st.sidebar.slider(
 )
 
 # --- COMPETITION & SINK (THE CHATTERJEE VARIABLES) ---
-st.sidebar.subheader("Competitive Environment")
-ab_blocker_conc = st.sidebar.slider(
+params.subheader("Competitive Environment")
+ab_blocker_conc = params.slider(
     "Therapeutic Antibody Blocker [nM]",
     0.0, 20.0, 0.0,
     help="Simulates a patient already on antibody therapy (e.g., Atezolizumab)."
 )
 
-st.sidebar.subheader("Pharmacokinetics (The Sink)")
-liver_sink = st.sidebar.slider(
+params.subheader("Pharmacokinetics (The Sink)")
+liver_sink = params.slider(
     "Liver/Kidney Sequestration [%]",
     0, 90, 30,
     help="Total % of injected dose lost to off-target organs. (Based on ~20% ID/g in 2019 Paper)."
 )
-st.sidebar.caption("Note: Sink % represents total dose unavailable for tumor binding.")
+params.caption("Note: Sink % represents total dose unavailable for tumor binding.")
 
-st.sidebar.subheader("Radiochemistry & Timing")
-spec_act = st.sidebar.number_input(
+params.subheader("Radiochemistry")
+spec_act = params.number_input(
     "Specific Activity [MBq/nmol]", 
     value=100.0,
     help="Radioactivity per unit of tracer mass."
 )
+params.form_submit_button("Update Model")
+
+st.sidebar.subheader("Dose Planning")
 injected_dose_nm = st.sidebar.slider("Planned Tracer Injection [nM]", 0.1, 50.0, 5.0)
-time_h = st.sidebar.slider(
-    "Time Post-Injection [hours]", 
-    0, 120, 24,
-    help="Radioactive signal decays over time using Zr-89 half-life."
-)
 
 # --- MODEL MATH (INTEGRATED LOGIC) ---
 
 # 1. Apply Sink Effect to injected dose
 effective_conc = injected_dose_nm * (1 - (liver_sink / 100))
-conc_range = np.linspace(0.1, 50, 200)
-effective_range = conc_range * (1 - (liver_sink / 100))
 
 # 2. Competitive Binding Equation (Cheng-Prusoff)
 # Kd_apparent = Kd * (1 + [Blocker]/Kd_blocker)
 kd_apparent = active_kd * (1 + (ab_blocker_conc / ATEZO_KD))
 
-def calc_binding(c, bmax_val, kd_app):
-    return (bmax_val * c) / (kd_app + c)
+@st.cache_data
+def saturation_curves(b_max, kd_apparent, uncertainty_pct, sink_frac):
+    """Central, High, and Low binding curves for the Uncertainty Band.
+
+    Pure function of the scalar inputs, so full reruns from the injection
+    slider, or form submits that only change specific activity, are served
+    from the cache.
+    """
+    effective_range = CONC_RANGE * (1 - sink_frac)
+    b_low = b_max * (1 - uncertainty_pct / 100)
+    b_high = b_max * (1 + uncertainty_pct / 100)
+    curves = langmuir_bundle(
+        effective_range, float(b_low), float(b_max), float(b_high), kd_apparent
+    )
+    # float32 is ample for plotting and halves the payload sent to plotly.js.
+    # One cast of the (3, N) block; the unpacked rows are views into it.
+    binding_low, specific_binding, binding_high = curves.astype(np.float32)
+    return CONC_RANGE.astype(np.float32), specific_binding, binding_low, binding_high
 
-# Central, High, and Low estimates for Uncertainty Band
-specific_binding = calc_binding(effective_range, b_max, kd_apparent)
-b_low = b_max * (1 - uncertainty_pct / 100)
-b_high = b_max * (1 + uncertainty_pct / 100)
-binding_low = calc_binding(effective_range, b_low, kd_apparent)
-binding_high = calc_binding(effective_range, b_high, kd_apparent)
+conc_range, specific_binding, binding_low, binding_high = saturation_curves(
+    b_max, kd_apparent, uncertainty_pct, liver_sink / 100
+)
 
-# Current point calculation
-current_binding = calc_binding(effective_conc, b_max, kd_apparent)
-occupancy = (effective_conc / (kd_apparent + effective_conc)) * 100
+# Current point calculation (curves above come fused from langmuir_bundle)
+current_binding = b_max * effective_conc / (kd_apparent + effective_conc)
+occupancy = (current_binding / b_max) * 100.0  # same Langmuir fraction, reused
 
-# 3. Radioactive Decay
-decay_constant = np.log(2) / ZR89_HALFLIFE
-remaining_frac = np.exp(-decay_constant * time_h)
+# 3. Radioactive Decay (time-dependent part lives in render_decay_metric)
 initial_signal = (current_binding / 1_000_000) * spec_act
-decayed_signal = initial_signal * remaining_frac
+
+@st.fragment
+def render_decay_metric(initial_signal):
+    """Imaging-window sweep. The time slider lives inside the fragment, so
+    moving it reruns only this block instead of the model and figure."""
+    time_h = st.slider(
+        "Time Post-Injection [hours]", 
+        0, MAX_IMAGING_HOURS, 24,
+        help="Radioactive signal decays over time using Zr-89 half-life."
+    )
+    remaining_frac = float(DECAY_LUT_ZR89[time_h])
+    decayed_signal = initial_signal * remaining_frac
+    st.metric(
+        f"Signal @ {time_h}h", 
+        f"{decayed_signal:.6f} MBq/mg",
+        delta=f"{(remaining_frac * 100):.1f}% remaining"
+    )
 
 # --- VISUALIZATION ---
-col1, col2 = st.columns([3, 1])
+def build_binding_figure(conc_range):
+    """Static skeleton of the binding profile: trace styling and layout.
+    The concentration grid never changes, so x is set once here.
 
-with col1:
+    Curves use go.Scattergl directly (the WebGL renderer px.line selects
+    with render_mode="webgl") so the band's fill and styling stay explicit.
+    """
     fig = go.Figure()
 
     # Uncertainty Band (Fill)
-    fig.add_trace(go.Scatter(
-        x=conc_range, y=binding_low, 
+    fig.add_trace(go.Scattergl(
+        x=conc_range, 
         mode="lines", line=dict(width=0), 
         showlegend=False, hoverinfo="skip"
     ))
-    fig.add_trace(go.Scatter(
-        x=conc_range, y=binding_high, 
+    fig.add_trace(go.Scattergl(
+        x=conc_range, 
         mode="lines", line=dict(width=0),
         fill="tonexty", fillcolor="rgba(255, 75, 75, 0.2)",
-        name=f"Uncertainty (±{uncertainty_pct}% Bmax)"
+        hoverinfo="skip"
     ))
 
     # Central Binding Curve
-    fig.add_trace(go.Scatter(
-        x=conc_range, y=specific_binding,
-        mode="lines", name=f"{selected_tracer} Binding",
+    fig.add_trace(go.Scattergl(
+        x=conc_range,
+        mode="lines",
         line=dict(color="#FF4B4B", width=4)
     ))
 
     # Operating Point
     fig.add_trace(go.Scatter(
-        x=[injected_dose_nm], y=[current_binding],
         mode="markers", name="Planned Dose",
         marker=dict(color="black", size=12, symbol="cross")
     ))
 
     # Kd Apparent Marker
     fig.add_vline(
-        x=kd_apparent, 
+        x=0, 
         line_dash="dash", 
         line_color="green",
-        annotation_text=f"Kd_app ({kd_apparent:.1f} nM)"
+        annotation_text="Kd_app"
     )
 
     fig.update_layout(
-        title=f"<b>Tracer Binding Profile: {selected_tracer}</b><br><sup>Modeling {liver_sink}% Sink Effect & {ab_blocker_conc}nM Antibody Competition</sup>",
         xaxis_title="Injected Concentration [nM]",
         yaxis_title="Bound Fraction [fmol/mg]",
         hovermode="x unified",
         template="plotly_white", 
         height=550
     )
+    return fig
+
+def update_binding_figure(fig, y_low, y_mid, y_high, op_x, op_y,
+                          kd_app, tracer_name, sink_pct, blocker, uncertainty_pct):
+    """Write the current rerun's curves and labels into the stored figure."""
+    band_low, band_high, curve, op_point = fig.data
+    with fig.batch_update():
+        band_low.y = y_low
+        band_high.y = y_high
+        band_high.name = f"Uncertainty (±{uncertainty_pct}% Bmax)"
+        curve.y = y_mid
+        curve.name = f"{tracer_name} Binding"
+        op_point.x = [op_x]
+        op_point.y = [op_y]
+        fig.layout.shapes[0].update(x0=kd_app, x1=kd_app)
+        fig.layout.annotations[0].update(x=kd_app, text=f"Kd_app ({kd_app:.1f} nM)")
+        fig.layout.title.text = f"<b>Tracer Binding Profile: {tracer_name}</b><br><sup>Modeling {sink_pct}% Sink Effect & {blocker}nM Antibody Competition</sup>"
+
+col1, col2 = st.columns([3, 1])
+
+with col1:
+    # Built once per browser session; reruns only swap in the new arrays
+    if "binding_fig" not in st.session_state:
+        st.session_state.binding_fig = build_binding_figure(conc_range)
+    fig = st.session_state.binding_fig
+    update_binding_figure(
+        fig, binding_low, specific_binding, binding_high,
+        injected_dose_nm, current_binding,
+        kd_apparent, selected_tracer, liver_sink, ab_blocker_conc, uncertainty_pct,
+    )
     st.plotly_chart(fig, use_container_width=True)
 
 with col2:
     st.metric("Effective Delivery", f"{effective_conc:.2f} nM", delta=f"-{liver_sink}% Sink")
     st.metric("Predicted Binding", f"{current_binding:.2f} fmol/mg")
     st.metric("Signal @ Injection", f"{initial_signal:.6f} MBq/mg")
-    st.metric(
-        f"Signal @ {time_h}h", 
-        f"{decayed_signal:.6f} MBq/mg",
-        delta=f"{(remaining_frac * 100):.1f}% remaining"
-    )
+    render_decay_metric(initial_signal)
     
     st.write(f"**Receptor Occupancy:** {occupancy:.1f}%")
     st.progress(min(occupancy/100, 1.0))
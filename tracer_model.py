@@ -0,0 +1,66 @@
+import math
+
+import numpy as np
+
+# --- SCIENTIFIC CONSTANTS (UPDATED PER LESNIAK ET AL. 2019) ---
+ZR89_HALFLIFE = 78.41  # Hours (Zirconium-89)
+ATEZO_KD = 0.43        # nM (Reference Antibody Blocker from 2016 paper)
+DECAY_CONSTANT_ZR89 = math.log(2) / ZR89_HALFLIFE  # 1/hours
+
+# Remaining Zr-89 fraction for every whole hour of the imaging-window slider
+MAX_IMAGING_HOURS = 120
+DECAY_LUT_ZR89 = np.exp(
+    -DECAY_CONSTANT_ZR89 * np.arange(0, MAX_IMAGING_HOURS + 1)
+).astype(np.float32)
+DECAY_LUT_ZR89.flags.writeable = False
+
+# Injected concentration grid [nM] shared by every rerun (read-only).
+# Log-spaced so samples cluster near Kd where the hyperbola bends most.
+CONC_RANGE = np.geomspace(0.1, 50, 64)
+CONC_RANGE.flags.writeable = False
+
+TRACER_LIBRARY = {
+    "WL12 (Chatterjee Peptide)": {
+        "kd_nm": 12.3,
+        "molecular_weight_kda": 1.5,
+        "note": "Affinity based on Ki (12.3nM) from 2019 FRET assay. Accounts for FPy-WL12 analog.",
+    },
+    "Atezolizumab (Antibody)": {
+        "kd_nm": 0.43,
+        "molecular_weight_kda": 145,
+        "note": "Reference clinical immuno-PET antibody tracer (Sub-nanomolar affinity).",
+    },
+    "PD-L1 Nanobody": {
+        "kd_nm": 2.10,
+        "molecular_weight_kda": 15,
+        "note": "Small biologic with fast kinetics and mid-range affinity.",
+    },
+    "PD-L1 Small Molecule": {
+        "kd_nm": 12.00,
+        "molecular_weight_kda": 0.8,
+        "note": "Fast distribution; generally lower affinity than antibodies.",
+    },
+}
+TRACER_KEYS = list(TRACER_LIBRARY.keys())
+
+# --- BINDING KERNEL (Numba-fused when available, NumPy otherwise) ---
+try:
+    from numba import njit
+except ImportError:
+    def langmuir_bundle(conc, b_low, b_mid, b_high, kd):
+        frac = np.add(conc, kd)
+        np.divide(conc, frac, out=frac)
+        return np.multiply(np.array([[b_low], [b_mid], [b_high]]), frac)
+else:
+    @njit(cache=True, fastmath=True)
+    def langmuir_bundle(conc, b_low, b_mid, b_high, kd):
+        n = conc.shape[0]
+        out = np.empty((3, n))
+        for i in range(n):
+            f = conc[i] / (kd + conc[i])
+            out[0, i] = b_low * f
+            out[1, i] = b_mid * f
+            out[2, i] = b_high * f
+        return out
+
+    langmuir_bundle(np.zeros(2), 0.0, 0.0, 0.0, 1.0)  # warm-compile once per process